@@ -1,10 +1,15 @@
+import io
 import os
 import random
-import heapq
+import bisect
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from collections import Counter, OrderedDict, defaultdict, deque
+from operator import itemgetter
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
 from dataclasses import dataclass
-from typing import Optional, List, Dict
+from typing import Optional, List, Dict, Set, Tuple
 import pygame
 
 
@@ -13,82 +18,39 @@ import pygame
 # -----------------------------
 
 @dataclass
-class Node:
-    """Doubly linked list node for a song."""
+class Song:
+    """A playlist entry; the playlist itself is a plain list indexed for next/prev."""
+    __slots__ = ("title", "path")  # no per-instance __dict__ (dataclass(slots=True) needs 3.10+)
     title: str
     path: str
-    prev: Optional['Node'] = None
-    next: Optional['Node'] = None
 
 
-class DoublyLinkedList:
-    """Playlist as a doubly linked list for efficient next/prev navigation."""
-    def __init__(self):
-        self.head: Optional[Node] = None
-        self.tail: Optional[Node] = None
-        self.size = 0
-
-    def append(self, title: str, path: str) -> Node:
-        node = Node(title, path)
-        if self.tail is None:
-            self.head = self.tail = node
-        else:
-            node.prev = self.tail
-            self.tail.next = node
-            self.tail = node
-        self.size += 1
-        return node
-
-    def clear(self):
-        self.head = self.tail = None
-        self.size = 0
-
-    def to_list(self) -> List[Node]:
-        out = []
-        cur = self.head
-        while cur:
-            out.append(cur)
-            cur = cur.next
-        return out
-
-    def from_nodes(self, nodes: List[Node]):
-        """Rebuild DLL from a list of nodes in order."""
-        self.clear()
-        prev = None
-        for n in nodes:
-            # detach n
-            n.prev = n.next = None
-            if self.head is None:
-                self.head = n
-            if prev is not None:
-                prev.next = n
-                n.prev = prev
-            prev = n
-        self.tail = prev
-        self.size = len(nodes)
+# Prefix search over a sorted title array (bisect) is cheaper than a Trie for
+# folder-sized libraries; flip this to use the Trie index instead.
+USE_TRIE = False
 
 
 class TrieNode:
     def __init__(self):
-        self.children: Dict[str, 'TrieNode'] = {}
-        self.ends: List[str] = []  # store titles completing here (could store indices)
+        self.children: Dict[str, 'TrieNode'] = defaultdict(TrieNode)
+        self.ends: Set[str] = set()  # titles completing here (folder-scoped, so unbounded is fine)
 
 class Trie:
     """Prefix search for song titles."""
     def __init__(self):
         self.root = TrieNode()
 
-    def insert(self, word: str):
+    def clear(self):
+        """Drop all words; the old subtree is freed as one unreachable graph."""
+        self.root = TrieNode()
+
+    def insert(self, word: str, lowered: Optional[str] = None):
+        """Index `word`; pass `lowered` if the caller already has word.lower()."""
+        word_lower = lowered if lowered is not None else word.lower()
         node = self.root
-        for ch in word.lower():
-            if ch not in node.children:
-                node.children[ch] = TrieNode()
-            node = node.children[ch]
-        # store at leaf (cap list to avoid growth)
-        if word not in node.ends:
-            node.ends.append(word)
-            if len(node.ends) > 20:
-                node.ends.pop(0)
+        for ch in word_lower:
+            node = node.children[ch]  # defaultdict creates missing children
+        node.ends.add(word)
 
     def prefix_search(self, prefix: str, limit: int = 20) -> List[str]:
         node = self.root
@@ -96,23 +58,20 @@ class Trie:
             if ch not in node.children:
                 return []
             node = node.children[ch]
-        # Collect words under this node (BFS, capped)
-        results = []
-        q = [(node, prefix)]
-        while q and len(results) < limit:
-            n, _ = q.pop(0)
-            results.extend(n.ends)
-            for ch, child in n.children.items():
-                q.append((child, prefix + ch))
-        # dedupe while preserving order
+        # Collect words under this node (BFS, capped, deduped on the fly)
         seen = set()
         out = []
-        for w in results:
-            if w not in seen:
-                out.append(w)
-                seen.add(w)
-            if len(out) >= limit:
-                break
+        q = deque([(node, prefix)])
+        while q:
+            n, _ = q.popleft()
+            for w in n.ends:
+                if w not in seen:
+                    seen.add(w)
+                    out.append(w)
+                    if len(out) >= limit:
+                        return out
+            for ch, child in n.children.items():
+                q.append((child, prefix + ch))
         return out
 
 
@@ -120,7 +79,7 @@ class Trie:
 # ------- Music Engine --------
 # -----------------------------
 
-AUDIO_EXTS = (".mp3", ".wav", ".ogg")
+AUDIO_EXTS = frozenset({"mp3", "wav", "ogg"})
 
 class MusicEngine:
     """Wrapper around pygame.mixer.music with simple state."""
@@ -130,8 +89,12 @@ class MusicEngine:
         pygame.mixer.music.set_volume(self.volume)
         self.paused = False
 
-    def load_and_play(self, path: str):
-        pygame.mixer.music.load(path)
+    def load_and_play(self, path: str, data: Optional[bytes] = None):
+        """Play `path`; if `data` holds its preloaded bytes, stream from memory instead."""
+        if data is not None:
+            pygame.mixer.music.load(io.BytesIO(data), os.path.splitext(path)[1].lstrip("."))
+        else:
+            pygame.mixer.music.load(path)
         pygame.mixer.music.play()
         self.paused = False
 
@@ -159,7 +122,16 @@ class MusicEngine:
 # --------- GUI App -----------
 # -----------------------------
 
+# Folder scans run here so large libraries don't freeze the Tk event loop
+_LOADER = ThreadPoolExecutor(max_workers=1)
+# Next-track reads share one worker: at most one running read plus one queued
+_PRELOADER = ThreadPoolExecutor(max_workers=1)
+# Bigger files (e.g. long WAVs) are loaded from their path as usual, not preloaded
+PRELOAD_MAX_BYTES = 32 * 1024 * 1024
+
 class MusicPlayerApp(tk.Tk):
+    _SEARCH_CACHE_MAX = 128  # prefixes kept in the search LRU
+
     def __init__(self):
         super().__init__()
         self.title("Python DSA Music Player")
@@ -167,19 +139,36 @@ class MusicPlayerApp(tk.Tk):
         self.minsize(840, 540)
 
         # DSA structures
-        self.dll = DoublyLinkedList()
-        self.history_stack: List[Node] = []          # back stack
-        self.play_counts: Dict[str, int] = {}        # title -> count (for heap)
+        self.history_stack: List[int] = []           # back stack (playlist indices)
+        self.play_counts: Counter = Counter()        # title -> count (top-K via most_common)
         self.trie = Trie()
+        self._titles_lower: List[str] = []           # sorted, lowercased (bisect)
+        self._titles_orig: List[str] = []            # same order, original case
         self.shuffle_on = False
+        self._search_after_id: Optional[str] = None  # pending debounced search
+        self._last_query: Optional[str] = None
+        self._search_cache: "OrderedDict[str, List[str]]" = OrderedDict()  # prefix -> suggestions (LRU)
 
-        self.current: Optional[Node] = None
-        self.node_by_title: Dict[str, Node] = {}     # fast lookup
+        self.current: Optional[Song] = None
+        self._cur_idx = -1                           # index of current in _songs
+        self._songs: List[Song] = []                 # the playlist array (next/prev/random by index)
+        self._title_to_idx: Dict[str, int] = {}      # title -> first playlist index
 
         self.engine = MusicEngine()
 
+        self._poll_after_id: Optional[str] = None    # pending end-of-song check
+        self._load_seq = 0                           # bumps per load_folder; stale scans are dropped
+        self._status_before_load = ""                # restored if a load doesn't replace the playlist
+
+        # Next-track preload (file read off the Tk thread)
+        self._preload_lock = threading.Lock()
+        self._preload_future: Optional[Future] = None
+        self._preload_future_path: Optional[str] = None
+        self._preload_target: Optional[str] = None   # path the worker should keep
+        self._preloaded: Optional[Tuple[str, bytes]] = None
+        self._shuffle_pick: Optional[int] = None     # shuffle target chosen ahead of time
+
         self._build_ui()
-        self._poll_playback()  # start polling loop (auto-next)
 
         # Keyboard shortcuts
         self.bind("<space>", lambda e: self._toggle_pause())
@@ -280,157 +269,299 @@ class MusicPlayerApp(tk.Tk):
         if not folder:
             return
 
-        files = [os.path.join(folder, f) for f in os.listdir(folder)]
-        songs = [(os.path.splitext(os.path.basename(p))[0], p) for p in files if p.lower().endswith(AUDIO_EXTS)]
+        self._load_seq += 1
+        seq = self._load_seq
+        self._status_before_load = self.status.cget("text")
+        self.status.config(text="Loading…")
+        fut = _LOADER.submit(self._scan_folder, folder)
+        self._wait_for_scan(seq, fut)
+
+    def _wait_for_scan(self, seq: int, fut: Future):
+        # Poll from the Tk thread so no Tk call is ever made from the worker
+        if fut.done():
+            self._apply_loaded(seq, fut)
+        else:
+            self.after(50, self._wait_for_scan, seq, fut)
+
+    @staticmethod
+    def _scan_folder(folder: str) -> List[Tuple[str, Song]]:
+        """Worker-thread half of load_folder: no Tk, no engine. Returns (lowered title, song), sorted."""
+        songs = []
+        with os.scandir(folder) as it:
+            for entry in it:
+                if not entry.is_file():
+                    continue
+                stem, dot, ext = entry.name.rpartition(".")
+                if dot and ext.lower() in AUDIO_EXTS:
+                    title = stem or entry.name
+                    songs.append((title.lower(), Song(title, entry.path)))
+        # Decorate with the lowered title so it is computed once and reused
+        # for the sort, _titles_lower and Trie.insert
+        songs.sort(key=itemgetter(0))
+        return songs
+
+    def _apply_loaded(self, seq: int, fut: "Future[List[Tuple[str, Song]]]"):
+        if seq != self._load_seq:
+            return  # a newer folder was picked while this one was scanning
+        try:
+            songs = fut.result()
+        except Exception as e:
+            self._restore_status()
+            messagebox.showerror("Load error", str(e))
+            return
 
         if not songs:
+            self._restore_status()
             messagebox.showinfo("No audio", "No .mp3/.wav/.ogg files found in this folder.")
             return
 
         # Reset DSA
         self.engine.stop()
-        self.dll.clear()
+        self._cancel_poll()
         self.history_stack.clear()
-        self.trie = Trie()
-        self.node_by_title.clear()
+        self.trie.clear()
+        self._last_query = None
+        self._search_cache.clear()
         self.current = None
+        self._cur_idx = -1
+        self._shuffle_pick = None
+        with self._preload_lock:
+            self._preload_target = None
+            self._preloaded = None
         self.playlist.delete(0, tk.END)
         self.suggest_list.delete(0, tk.END)
 
         # Fill data structures
-        nodes = []
-        for title, path in sorted(songs, key=lambda x: x[0].lower()):
-            node = self.dll.append(title, path)
-            self.trie.insert(title)
-            self.node_by_title[title] = node
-            nodes.append(node)
-            self.playlist.insert(tk.END, title)
-
-        self.status.config(text=f"Loaded {len(nodes)} songs")
+        self._songs = [song for _, song in songs]
+        self._titles_lower = [lowered for lowered, _ in songs]
+        self._titles_orig = [song.title for song in self._songs]
+        self._title_to_idx = {}
+        for i, title in enumerate(self._titles_orig):
+            self._title_to_idx.setdefault(title, i)  # stems can repeat (a.mp3 / a.ogg)
+        if USE_TRIE:
+            for lowered, song in songs:
+                self.trie.insert(song.title, lowered)
+
+        # One Tcl call for the whole playlist instead of one per song
+        self.playlist.insert(tk.END, *self._titles_orig)
+        self.status.config(text=f"Loaded {len(self._songs)} songs")
         self.now_label.config(text="—")
 
+    def _restore_status(self):
+        # The old playlist is still loaded (and may be playing); say so
+        if self.current and self.engine.paused:
+            self.status.config(text="Paused")
+        elif self.current and self.engine.is_busy():
+            self.status.config(text=f"Playing: {self.current.title}")
+        else:
+            self.status.config(text=self._status_before_load)
+
     # ---------- Playback ----------
-    def play_node(self, node: Node):
-        if node is None:
+    def play_index(self, idx: int):
+        if not 0 <= idx < len(self._songs):
             return
+        song = self._songs[idx]
+        data = None
+        with self._preload_lock:
+            if self._preloaded is not None and self._preloaded[0] == song.path:
+                data = self._preloaded[1]
+                self._preloaded = None
         try:
-            self.engine.load_and_play(node.path)
+            self.engine.load_and_play(song.path, data)
         except Exception as e:
             messagebox.showerror("Playback error", str(e))
             return
-        # Update counts (for heap)
-        self.play_counts[node.title] = self.play_counts.get(node.title, 0) + 1
+        # Update counts (for top played)
+        self.play_counts[song.title] += 1
         # Update current and UI
-        self.current = node
-        self.now_label.config(text=node.title)
-        self._select_in_listbox(node.title)
-        self.status.config(text=f"Playing: {node.title}")
+        self.current = song
+        self._cur_idx = idx
+        self.now_label.config(text=song.title)
+        self._select_in_listbox(idx)
+        self.status.config(text=f"Playing: {song.title}")
+        self._schedule_poll()
+        self._shuffle_pick = None
+        self._start_preload()
 
     def play_selected(self):
         sel = self.playlist.curselection()
-        if not sel:
-            # If nothing selected, play first item
-            title = self.playlist.get(0) if self.playlist.size() > 0 else None
-        else:
-            title = self.playlist.get(sel[0])
-
-        if not title:
-            return
-
-        node = self.node_by_title.get(title)
-        if node is None:
+        # If nothing selected, play first item (playlist rows are _songs indices)
+        idx = sel[0] if sel else 0
+        if idx >= len(self._songs):
             return
 
         # push current to history if moving
-        if self.current and self.current is not node:
-            self.history_stack.append(self.current)
+        if self.current and self._cur_idx != idx:
+            self.history_stack.append(self._cur_idx)
 
-        self.play_node(node)
+        self.play_index(idx)
 
     def _toggle_pause(self):
         if self.engine.is_busy() and not self.engine.paused:
             self.engine.pause()
+            self._cancel_poll()
             self.status.config(text="Paused")
         else:
             self.engine.resume()
+            if self.current and self.engine.is_busy():
+                self._schedule_poll()
             self.status.config(text="Resumed")
 
     def stop_song(self):
         self.engine.stop()
+        self._cancel_poll()
         self.status.config(text="Stopped")
 
     def next_song(self):
-        nxt = None
-        if self.shuffle_on:
-            nxt = self._random_next()
-        else:
-            nxt = self.current.next if self.current else self.dll.head
+        nxt = self._peek_next()
+        self._shuffle_pick = None
 
-        if nxt:
+        if nxt is not None:
             if self.current:
-                self.history_stack.append(self.current)
-            self.play_node(nxt)
+                self.history_stack.append(self._cur_idx)
+            self.play_index(nxt)
         else:
+            self._cancel_poll()
             self.status.config(text="End of playlist")
 
     def prev_song(self):
         if self.history_stack:
             prev = self.history_stack.pop()
-            self.play_node(prev)
+            self.play_index(prev)
         else:
             self.status.config(text="No previous song")
 
-    def _random_next(self) -> Optional[Node]:
-        # Pick a random neighbor excluding current; still push history for back-nav
-        nodes = self.dll.to_list()
-        if not nodes:
+    def _peek_next(self) -> Optional[int]:
+        """Index next_song() would play; shuffle picks are made once and reused."""
+        if self.shuffle_on:
+            if self._shuffle_pick is None:
+                self._shuffle_pick = self._random_next()
+            return self._shuffle_pick
+        i = self._cur_idx + 1
+        return i if i < len(self._songs) else None
+
+    def _start_preload(self):
+        nxt = self._peek_next()
+        path = self._songs[nxt].path if nxt is not None else None
+        with self._preload_lock:
+            self._preload_target = path
+            if self._preloaded is not None:
+                if self._preloaded[0] == path:
+                    return
+                self._preloaded = None
+        if path is None:
+            return
+        pending = self._preload_future
+        if pending is not None and not pending.done():
+            if self._preload_future_path == path:
+                return  # already reading this file
+            pending.cancel()  # drops a stale read that hasn't started yet
+        self._preload_future_path = path
+        self._preload_future = _PRELOADER.submit(self._preload_worker, path)
+
+    def _preload_worker(self, path: str):
+        # Runs off the Tk thread: only touches the preload slot, under the lock
+        with self._preload_lock:
+            if self._preload_target != path:
+                return  # superseded while queued
+        try:
+            if os.path.getsize(path) > PRELOAD_MAX_BYTES:
+                return
+            with open(path, "rb") as f:
+                data = f.read()
+        except OSError:
+            return
+        with self._preload_lock:
+            if self._preload_target == path:
+                self._preloaded = (path, data)
+
+    def _random_next(self) -> Optional[int]:
+        # Pick a random index other than the current one
+        n = len(self._songs)
+        if n == 0:
             return None
         if self.current is None:
-            return random.choice(nodes)
-        if len(nodes) == 1:
+            return random.randrange(n)
+        if n == 1:
             return None
-        choices = [n for n in nodes if n is not self.current]
-        return random.choice(choices) if choices else None
+        while True:
+            choice = random.randrange(n)
+            if choice != self._cur_idx:
+                return choice
 
     def _on_volume_change(self, _):
         self.engine.set_volume(self.volume.get() / 100.0)
 
-    # ---------- Search (Trie) ----------
+    # ---------- Search (sorted array / Trie) ----------
     def _on_search_change(self, _event):
+        # Debounce: only the last keystroke in a burst runs the search
+        if self._search_after_id:
+            self.after_cancel(self._search_after_id)
+        self._search_after_id = self.after(120, self._do_search)
+
+    def _do_search(self):
+        self._search_after_id = None
         q = self.search_entry.get().strip()
+        if q == self._last_query:
+            return
+        self._last_query = q
         self.suggest_list.delete(0, tk.END)
         if not q:
             return
-        suggestions = self.trie.prefix_search(q, limit=30)
-        for s in suggestions:
-            self.suggest_list.insert(tk.END, s)
+        key = q.lower()
+        suggestions = self._search_cache.get(key)
+        if suggestions is not None:
+            self._search_cache.move_to_end(key)
+        else:
+            suggestions = self._prefix_search(q, limit=30)
+            self._search_cache[key] = suggestions
+            if len(self._search_cache) > self._SEARCH_CACHE_MAX:
+                self._search_cache.popitem(last=False)
+        if suggestions:
+            self.suggest_list.insert(tk.END, *suggestions)
+
+    def _prefix_search(self, prefix: str, limit: int = 20) -> List[str]:
+        if USE_TRIE:
+            return self.trie.prefix_search(prefix, limit=limit)
+        q = prefix.lower()
+        titles_lower = self._titles_lower
+        lo = bisect.bisect_left(titles_lower, q)
+        out = []
+        for i in range(lo, min(lo + limit, len(titles_lower))):
+            if not titles_lower[i].startswith(q):
+                break  # sorted, so the prefix range has ended
+            out.append(self._titles_orig[i])
+        return out
 
     def _choose_suggestion(self, _event):
         sel = self.suggest_list.curselection()
         if not sel:
             return
-        title = self.suggest_list.get(sel[0])
-        self._select_in_listbox(title)
+        idx = self._title_to_idx.get(self.suggest_list.get(sel[0]))
+        if idx is None:
+            return
+        self._select_in_listbox(idx)
         # focus playlist so user can hit Enter to play or double-click
         self.playlist.focus_set()
 
     def _go_to_first_suggestion(self, _event):
+        # Flush a pending debounced search so we don't act on a stale list
+        if self._search_after_id:
+            self.after_cancel(self._search_after_id)
+        self._do_search()
         if self.suggest_list.size() > 0:
-            title = self.suggest_list.get(0)
-            self._select_in_listbox(title)
+            idx = self._title_to_idx.get(self.suggest_list.get(0))
+            if idx is None:
+                return
+            self._select_in_listbox(idx)
             self.play_selected()
 
-    # ---------- Top Played (Max-Heap) ----------
+    # ---------- Top Played (Counter.most_common / heap) ----------
     def show_top_played(self, top_k: int = 10):
         if not self.play_counts:
             messagebox.showinfo("Top Played", "No play history yet.")
             return
-        heap = [(-cnt, title) for title, cnt in self.play_counts.items()]
-        heapq.heapify(heap)
-        items = []
-        for _ in range(min(top_k, len(heap))):
-            neg, title = heapq.heappop(heap)
-            items.append((title, -neg))
+        items = self.play_counts.most_common(top_k)
 
         win = tk.Toplevel(self)
         win.title("Top Played")
@@ -449,46 +580,55 @@ class MusicPlayerApp(tk.Tk):
             if not sel:
                 return
             title = tree.item(sel[0], "values")[0]
-            node = self.node_by_title.get(title)
-            if node:
+            idx = self._title_to_idx.get(title)
+            if idx is not None:
                 if self.current:
-                    self.history_stack.append(self.current)
-                self.play_node(node)
+                    self.history_stack.append(self._cur_idx)
+                self.play_index(idx)
 
         ttk.Button(win, text="Play Selected", command=play_sel).pack(pady=(0, 8))
         tree.bind("<Double-Button-1>", play_sel)
 
     # ---------- Helpers ----------
-    def _select_in_listbox(self, title: str):
-        try:
-            idxs = self.playlist.get(0, tk.END)
-            for i, t in enumerate(idxs):
-                if t == title:
-                    self.playlist.selection_clear(0, tk.END)
-                    self.playlist.selection_set(i)
-                    self.playlist.see(i)
-                    break
-        except Exception:
-            pass
+    def _select_in_listbox(self, i: int):
+        # playlist rows are inserted in _songs order, so the index is the row
+        self.playlist.selection_clear(0, tk.END)
+        self.playlist.selection_set(i)
+        self.playlist.see(i)
 
     def _toggle_shuffle(self):
         self.shuffle_on = not self.shuffle_on
         self.shuffle_var.set(self.shuffle_on)
+        self._shuffle_pick = None
+        if self.current:
+            self._start_preload()
         self.status.config(text=f"Shuffle {'ON' if self.shuffle_on else 'OFF'}")
 
+    def _schedule_poll(self):
+        if self._poll_after_id is None:
+            self._poll_after_id = self.after(1000, self._poll_playback)
+
+    def _cancel_poll(self):
+        if self._poll_after_id is not None:
+            self.after_cancel(self._poll_after_id)
+            self._poll_after_id = None
+
     def _poll_playback(self):
         """
-        Tkinter-friendly polling loop:
-        - If a song is playing and finishes (not paused), auto-advance.
-        - Runs every 500ms.
+        Tkinter-friendly end-of-song check:
+        - If a song is playing and finishes, auto-advance.
+        - Runs every 1000ms, only while a track is actually playing
+          (cancelled on pause, stop and end of playlist), so the idle
+          player never wakes up.
         """
-        try:
-            if not self.engine.paused and self.current:
-                if not self.engine.is_busy():
-                    # Song finished → auto next
-                    self.next_song()
-        finally:
-            self.after(500, self._poll_playback)
+        self._poll_after_id = None
+        if self.current is None or self.engine.paused:
+            return
+        if not self.engine.is_busy():
+            # Song finished → auto next (play_index re-arms the tick)
+            self.next_song()
+        else:
+            self._schedule_poll()
 
 
 if __name__ == "__main__":